@@ -1,10 +1,11 @@
 # -*- coding: UTF-8 -*-
 
 import argparse
+import asyncio
 import curses
 import datetime
+import operator
 import sys
-import time
 import traceback
 
 from .configparser import Config
@@ -17,62 +18,65 @@ __version__ = '0.7.0'
 
 _debug = 0
 
+# the longest sleep in seconds, so a jump in the wall clock is noticed soon
+_maxSleep = 60
+
 _noErrors = 0
 _unexpectedError = 1
 _configError = 2
 _displayError = 3
 _dataError = 4
 
+# the config options used by the components, a tuple of keys collects a tuple of values
+_dataOptionKeys = {
+	'dateField': 'data.fields.date',
+	'priceWithTaxField': 'data.fields.priceWithTax',
+	'priceNoTaxField': 'data.fields.priceNoTax',
+	'source': 'data.source'
+}
+
+_displayOptionKeys = {
+	'carets': ( 'caret.style.above', 'caret.style.below' ),
+	'extremesVisible': 'extremes.visible',
+	'extremes': ( 'extremes.style.lowest', 'extremes.style.highest' ),
+	'missing': 'missing.style',
+	'limits': ( 'price.low', 'price.high' ),
+	'day': ( 'day.begins', 'day.ends' ),
+	'slowTerminal': 'terminal.slow',
+	'terminalDelay': 'terminal.delay',
+	'pastHours': 'caret.pastHours',
+	'preferred': 'layout.preferred',
+	'reverse': 'layout.reverse',
+	'normalTimezone': 'data.normalTimezone'
+}
+
+def _CollectOptions( options, keys ):
+	"""Collects the options for a component from the config options. Raises a KeyError for the first missing option."""
+	
+	collected = {}
+	for name, key in keys.items():
+		if type( key ) == tuple:
+			collected[name] = operator.itemgetter( *key )( options )
+		else:
+			collected[name] = options[key]
+	
+	return collected
+
 class App:
 	"""An application for displaying and updating price data."""
 	
 	_running = False
+	_prices = None
 	
 	def __init__( self, options ):
-		dataOptions = {}
-		displayOptions = {}
-		
 		# check that all options are present
 		try:
 			freq = options['data.updateFrequency']
 			available = options['data.availableAt']
 			
-			dataOptions['dateField'] = options['data.fields.date']
-			dataOptions['priceWithTaxField'] = options['data.fields.priceWithTax']
-			dataOptions['priceNoTaxField'] = options['data.fields.priceNoTax']
-			dataOptions['source'] = options['data.source']
-			
-			displayOptions['carets'] = (
-				options['caret.style.above'],
-				options['caret.style.below']
-			)
-			
-			displayOptions['extremesVisible'] = options['extremes.visible']
-			displayOptions['extremes'] = (
-				options['extremes.style.lowest'],
-				options['extremes.style.highest']
-			)
-			
-			displayOptions['missing'] = options['missing.style']
-			
-			displayOptions['limits'] = (
-				options['price.low'],
-				options['price.high']
-			)
-			
-			displayOptions['day'] = (
-				options['day.begins'],
-				options['day.ends']
-			)
-			
-			displayOptions['slowTerminal'] = options['terminal.slow']
-			displayOptions['terminalDelay'] = options['terminal.delay']
-			
-			displayOptions['pastHours'] = options['caret.pastHours']
-			displayOptions['preferred'] = options['layout.preferred']
-			displayOptions['reverse'] = options['layout.reverse']
-			
-			displayOptions['normalTimezone'] = options['data.normalTimezone']
+			dataOptions = _CollectOptions( options, _dataOptionKeys )
+			dataOptions['stream'] = options.get( 'data.stream', False )
+			displayOptions = _CollectOptions( options, _displayOptionKeys )
 		
 		except KeyError as err:
 			raise MissingOptionError( err.args[0] )
@@ -81,8 +85,15 @@ class App:
 		self._available = available
 		self._dataAvailable = self._AvailableFromTime()
 		
-		stdscr = curses.initscr()
-		self._display = PriceDisplay( ( 0,0 ), displayOptions, parent=stdscr )
+		# the display needs the screen to find its size and layout
+		self._stdscr = stdscr = curses.initscr()
+		try:
+			self._display = PriceDisplay( ( 0,0 ), displayOptions, parent=stdscr )
+		
+		# restore the terminal, so the error can be shown
+		except Exception:
+			curses.endwin()
+			raise
 		
 		self._data = PriceDataHandler( dataOptions )
 	
@@ -90,7 +101,7 @@ class App:
 		"""Reverse terminal settings."""
 		
 		curses.echo()
-		curses.cbreak()
+		curses.nocbreak()
 		curses.curs_set(1)
 		curses.endwin()
 	
@@ -108,12 +119,12 @@ class App:
 		curses.init_pair( 3, curses.COLOR_RED, -1 )
 		curses.init_pair( 4, curses.COLOR_CYAN, -1 )
 	
-	def _InitializeDisplay( self ):
+	async def _InitializeDisplay( self ):
 		"""Initialize the price display."""
 		
-		self._data.Update()
-		prices = self._data.GetPrices()
-		self._display.Update( prices )
+		await self._UpdateData()
+		self._display.Update( self._prices )
+		curses.doupdate()
 		
 		now = datetime.datetime.now()
 		self._lastDisplayUpdate = now
@@ -122,12 +133,9 @@ class App:
 	def _AvailableFromTime( self ):
 		"""Find the datetime after which new price data is expected to be available."""
 		
-		today = datetime.datetime.today()
-		iso = today.isoformat()
-		date = iso.split( 'T' )[0]
-		
-		availableIso = date + 'T' + self._available
-		availableTime = datetime.datetime.fromisoformat( availableIso )
+		today = datetime.date.today()
+		available = datetime.time.fromisoformat( self._available )
+		availableTime = datetime.datetime.combine( today, available )
 		
 		return availableTime
 	
@@ -136,78 +144,115 @@ class App:
 		
 		self._dataAvailable = self._AvailableFromTime()
 		self._data.MidnightUpdate()
+		self._prices = self._data.GetPrices()
 		self._lastDataUpdate = now
+		
+		# only the changes are drawn, so repaint the whole terminal once a day in case something else has written on it
+		self._stdscr.clearok( True )
+		self._stdscr.noutrefresh()
 	
-	def _DailyDataUpdate( self, now ):
+	async def _DailyDataUpdate( self, now ):
 		"""Checks the data source for new data. If there is price data for tomorrow, updates the display."""
 		
-		prices = self._data.GetPrices()
+		# schedule the next poll, even if this one fails
+		self._lastDataUpdate = now
 		
-		if not prices.tomorrow:
-			try:
-				self._data.Update()
-				prices = self._data.GetPrices()
-				self._lastDataUpdate = now
-			
-			# catch any request errors and try again later
-			except DataRequestError:
-				pass
-			
-			if prices.tomorrow:
-				self._display.Update( prices )
-				self._lastDisplayUpdate = now
+		try:
+			await self._UpdateData()
+		
+		# catch any request errors and try again later
+		except DataRequestError:
+			pass
+		
+		if self._prices.tomorrow:
+			self._display.Update( self._prices )
+			self._lastDisplayUpdate = now
 	
-	def _HourlyUpdate( self, now ):
+	async def _HourlyUpdate( self, now ):
 		"""Updates the display every hour."""
 		
 		# try updating prices, if any of the prices for today are missing
-		prices = self._data.GetPrices()
-		if None in prices.today:
+		if None in self._prices.today:
 			try:
-				self._data.Update()
-				prices = self._data.GetPrices()
+				await self._UpdateData()
 			except DataRequestError:
 				pass
 		
-		self._display.Update( prices )
+		self._display.Update( self._prices )
 		self._lastDisplayUpdate = now
 	
-	def _Mainloop( self ):
-		"""Mainloop of the application."""
+	async def _UpdateData( self ):
+		"""Retrieves new data from the source and caches the prices, so they are only copied when they change. The request is run in an executor, so it doesn't block the event loop."""
+		
+		loop = asyncio.get_running_loop()
+		await loop.run_in_executor( None, self._data.Update )
+		self._prices = self._data.GetPrices()
+	
+	def _NextEvent( self, now, delta ):
+		"""Finds the datetime of the next event, which requires an update: the next hour, when new data is expected, or the next data poll."""
+		
+		# midnight is always an hour boundary, so it's covered by the next hour
+		nextHour = now.replace( minute=0, second=0, microsecond=0 ) + datetime.timedelta( hours=1 )
+		
+		# no more data is expected before midnight
+		if self._data.tomorrowComplete:
+			return nextHour
+		
+		if now < self._dataAvailable:
+			nextData = self._dataAvailable
+		else:
+			nextData = self._lastDataUpdate + delta
+		
+		return min( nextHour, nextData )
+	
+	async def _Mainloop( self ):
+		"""Mainloop of the application. Sleeps until the next event, instead of polling."""
 		
 		delta = datetime.timedelta( minutes=self._updateFrequency )
+		getNow = datetime.datetime.now
+		
 		while self._running:
-			now = datetime.datetime.now()
+			now = getNow()
 			
 			# is midnight
 			if now.day != self._lastDataUpdate.day:
 				self._MidnightUpdate( now )
 			
-			# new data will be available soon, check every five minutes
-			if now > self._dataAvailable:
-				if now - self._lastDataUpdate > delta:
-					self._DailyDataUpdate( now )
+			# new data will be available soon, check with the update frequency until all of it has been received
+			if now >= self._dataAvailable and not self._data.tomorrowComplete:
+				if now - self._lastDataUpdate >= delta:
+					await self._DailyDataUpdate( now )
 			
 			# update the hourly prices
 			if now.hour != self._lastDisplayUpdate.hour:
-				self._HourlyUpdate( now )
+				await self._HourlyUpdate( now )
 			
-			time.sleep( 1 )
-		
+			# draw all the changes to the screen at once
+			curses.doupdate()
+			
+			# sleep until the next event, the sleep runs on a monotonic clock, so wake up regularly to check the time
+			wake = self._NextEvent( now, delta ) - getNow()
+			await asyncio.sleep( min( max( 0, wake.total_seconds() ), _maxSleep ) )
+	
+	async def _Run( self ):
+		"""Initializes the display and runs the Mainloop."""
 		
+		await self._InitializeDisplay()
+		await self._Mainloop()
+	
 	def Start( self ):
-		"""Initializes curses and display, then runs the Mainloop in the same thread until application is stopped or interrupted."""
+		"""Initializes curses and display, then runs the Mainloop in an event loop until application is stopped or interrupted."""
 		
 		self._running  = True
 		self._InitCurses()
-		self._InitializeDisplay()
-		self._Mainloop()
+		asyncio.run( self._Run() )
 	
 	def Stop( self ):
 		"""Stop the application and clear the curses environment."""
 		
 		self._running = False
 		self._EndCurses()
+		self._data.Close()
 
 ###  helper functions for reading the settings, initializing and/or resetting the app and running it  ###
 
@@ -1,14 +1,90 @@
 # -*- coding: UTF-8 -*-
 
+import copy
+import functools
 import os
-import usersettings
+import pickle
+import tempfile
 import yaml
 
+# use the faster libyaml bindings, if available
+try:
+	from yaml import CSafeLoader as _Loader, CSafeDumper as _Dumper
+except ImportError:
+	from yaml import SafeLoader as _Loader, SafeDumper as _Dumper
+
 from .exceptions import ConfigParsingError
 from .exceptions import CorruptedTemplateError, MissingTemplateError, TemplateParsingError
 
 __version__ = '0.7.0'
 
+_yes = frozenset( ( 'y', 'yes' ) )
+_no = frozenset( ( 'n', 'no' ) )
+
+_boolTrue = frozenset( ( True, 'true', '1' ) )
+_boolFalse = frozenset( ( False, 'false', '0' ) )
+
+###  helpers for finding and parsing the config files  ###
+
+def _ParseYamlFile( path ):
+	"""Parses a yaml file. The parsed files are cached for as long as they are unchanged, so the result must be copied before modifying it."""
+	
+	stat = os.stat( path )
+	return _ParseYamlFileVersion( path, stat.st_mtime_ns, stat.st_size )
+
+@functools.lru_cache( maxsize=None )
+def _ParseYamlFileVersion( path, mtime, size ):
+	"""Parses a given version of a yaml file, identified by the modification time and size."""
+	
+	with open( path, 'r' ) as file:
+		return yaml.load( file, Loader=_Loader )
+
+def _VersionKey( version ):
+	"""Converts a version string to a tuple of integers for comparing versions. Returns None, if the string isn't a version."""
+	
+	try:
+		return tuple( int( part ) for part in version.split('.') )
+	except ValueError:
+		return None
+
+###  validators for the option types, raise a ValueError if the value doesn't match the type  ###
+
+def _ValidateBool( value ):
+	# accept the strings in any case
+	if isinstance( value, str ):
+		value = value.lower()
+	
+	if value in _boolTrue:
+		return True
+	
+	if value in _boolFalse:
+		return False
+	
+	raise ValueError( 'Invalid value' )
+
+def _ValidateChar( value ):
+	value = str( value )
+	if len( value ) != 1:
+		raise ValueError( 'Invalid value' )
+	
+	return value
+
+def _ValidateTime( value ):
+	parts = value.split(':')
+	if not all( part.isdecimal() for part in parts ):
+		raise ValueError( 'Invalid value' )
+	
+	return value
+
+_validators = {
+	'bool': _ValidateBool,
+	'char': _ValidateChar,
+	'float': float,
+	'int': int,
+	'string': str,
+	'time': _ValidateTime
+}
+
 class _Queries:
 	def _YesNo( self, question ):
 		"""A simple yes/no prompt."""
@@ -16,11 +92,11 @@ class _Queries:
 		answer = None
 		while answer == None:
 			inp = input( question + ' (y/n): ' )
-			inp = inp.lower()
+			inp = inp.strip().lower()
 			
-			if inp in ( 'y', 'yes' ):
+			if inp in _yes:
 				answer = True
-			elif inp in ( 'n', 'no' ):
+			elif inp in _no:
 				answer = False
 		
 		return answer
@@ -45,55 +121,26 @@ class _Queries:
 	def _Validate( self, value, type ):
 		"""Checks that the given value is of the given type and returns the value in that type. If the type doesn't match, raises a ValueError."""
 		
-		if type == 'bool':
-			if value in ( True, 'True', 'true', '1' ):
-				return True
-				
-			if value in ( False, 'False', 'false', '0' ):
-				return False
-			
+		try:
+			return _validators[type]( value )
+		except KeyError:
+			raise ValueError( 'Invalid type' )
+		except ( AttributeError, TypeError, ValueError ):
 			raise ValueError( 'Invalid value' )
-		
-		if type == 'char':
-			value = str( value )
-			if len( value ) == 1:
-				return value
-		
-		if type == 'float':
-			try:
-				return float( value )
-			except:
-				raise ValueError( 'Invalid value' )
-		
-		if type == 'int':
-			try:
-				return int( value )
-			except:
-				raise ValueError( 'Invalid value' )
-		
-		if type == 'string':
-			return str( value )
-		
-		if type == 'time':
-			try:
-				parts = value.split(':')
-				for part in parts:
-					int( part )
-			except:
-				raise ValueError( 'Invalid value' )
-			
-			return str( value )
-		
-		raise ValueError( 'Invalid type' )
 
 class Config(_Queries):
 	"""Represents a configuration loaded from a yaml file. If a path is given, tries it first, then the default user config path. If both fail, creates a new file from a template. The template path can also be given as an argument."""
 	
 	def __init__( self, path='', templatePath='' ):
+		import usersettings
+		
 		userConfig = usersettings.appdirs.user_config_dir()
 		self._userConfigPath = os.path.join( userConfig, 'pricedisplay', __version__ )
 		self._userConfigFilePath = os.path.join( self._userConfigPath, 'config.yml' )
 		
+		userCache = usersettings.appdirs.user_cache_dir()
+		self._cacheFilePath = os.path.join( userCache, 'pricedisplay', __version__, 'config.pkl' )
+		
 		# use the default path for the template
 		if not templatePath:
 			modulePath = __file__
@@ -102,11 +149,10 @@ class Config(_Queries):
 		self._templatePath = os.path.join( templatePath, 'config.template' )
 		self._migrationRulesPath = os.path.join( templatePath, 'config.migrate' )
 		
-		self._oldConfigFilePath, self._oldVersion = self._FindOldPath()
 		self._configPath = self._FindPath( path )
 		
 		try:
-			self._config = self._LoadFile( self._configPath )
+			self._config = self._LoadCachedFile( self._configPath )
 			self.options = self._Parse()
 		except ConfigParsingError as err:
 			print(err)
@@ -124,7 +170,7 @@ class Config(_Queries):
 		"""Prompts the user to give a value for each option in the option type. If the option was migrated, skip it. Empty string sets the default."""
 		
 		essentialOnly = self._YesNo('Only edit essential options?')
-		for keyList, option in _OptionIterator( config ):
+		for keyList, option in _IterOptions( config ):
 			# if option was migrated, don't ask to edit it
 			if 'migrated' in option.keys():
 				del option['migrated']
@@ -140,19 +186,13 @@ class Config(_Queries):
 		"""Finds the path to the config file. Tries first the file supplied as an argument, then the default config path. If no file is found, creates one from template."""
 		
 		# first try the path given as the argument
-		try:
-			with open( path, 'r' ) as file:
-				return path
-		except OSError:
-			pass
+		if os.path.isfile( path ):
+			return path
 		
 		# try the user config path
 		ucfp = self._userConfigFilePath
-		try:
-			with open( ucfp, 'r' ) as file:
-				return ucfp
-		except OSError:
-			pass
+		if os.path.isfile( ucfp ):
+			return ucfp
 		
 		# create a new config file from template
 		os.makedirs( self._userConfigPath, exist_ok=True )
@@ -163,8 +203,7 @@ class Config(_Queries):
 	def _FindOldPath( self ):
 		"""Finds the path of the last config file before the current version for settings migration."""
 		
-		userConfig = usersettings.appdirs.user_config_dir()
-		configPath = os.path.join( userConfig, 'pricedisplay' )
+		configPath = os.path.dirname( self._userConfigPath )
 		
 		oldVersion = self._FindOldVersion( configPath )
 		oldConfigFilePath = None
@@ -172,10 +211,8 @@ class Config(_Queries):
 		if oldVersion:
 			oldConfigFilePath = os.path.join( configPath, oldVersion, 'config.yml' )
 			
-			# verify that the file is readable
-			try:
-				open( oldConfigFilePath, 'r' ).close()
-			except OSError:
+			# verify that the file exists
+			if not os.path.isfile( oldConfigFilePath ):
 				oldConfigFilePath = None
 		
 		return oldConfigFilePath, oldVersion
@@ -183,45 +220,67 @@ class Config(_Queries):
 	def _FindOldVersion( self, path ):
 		"""Checks for old config versions in the config path and returns the newest version."""
 		
-		# find all the config files in the config directory
-		gen = os.walk( path )
+		# find the version directories in the config directory
 		try:
-			versions = next( gen )[1]
-		except StopIteration:
+			with os.scandir( path ) as entries:
+				versions = [ entry.name for entry in entries if entry.is_dir() ]
+		except OSError:
 			versions = []
 		
-		# don't consider the current version, if it exists
+		# don't consider the current or newer versions, or directories that aren't versions
+		current = _VersionKey( __version__ )
 		oldVersions = []
 		for version in versions:
-			if version < __version__:
+			key = _VersionKey( version )
+			if key and key < current:
 				oldVersions.append( version )
 		
 		# if old versions exist, pick the latest
-		oldVersions.sort()
-		if len( oldVersions ):
-			oldVersion = oldVersions[-1]
+		if oldVersions:
+			oldVersion = max( oldVersions, key=_VersionKey )
 		else:
 			oldVersion = None
 		
 		return oldVersion
 	
-	def _LoadFile( self, path ):
-		"""Loads the config file as yaml."""
+	def _LoadCachedFile( self, path ):
+		"""Loads the config file from the cache, if the file hasn't changed since it was cached. Otherwise loads the file as yaml and updates the cache."""
 		
-		with open( path, 'r' ) as file:
-			try:
-				config = yaml.safe_load( file )
-			except yaml.scanner.ScannerError:
-				raise ConfigParsingError( "Can't parse the configuration file: " + path )
+		stat = os.stat( path )
+		key = ( os.path.abspath( path ), stat.st_mtime_ns, stat.st_size )
+		
+		try:
+			with open( self._cacheFilePath, 'rb' ) as file:
+				cachedKey, config = pickle.load( file )
+			
+			if cachedKey == key:
+				return config
+		
+		# a missing, corrupted or foreign cache can fail in many ways, parse the file instead
+		except Exception:
+			pass
+		
+		config = self._LoadFile( path )
+		self._WriteCache( key, config )
 		
 		return config
 	
+	def _LoadFile( self, path ):
+		"""Loads the config file as yaml. Returns a copy of the cached file, since the config may be modified after loading."""
+		
+		try:
+			config = _ParseYamlFile( path )
+		except yaml.YAMLError:
+			raise ConfigParsingError( "Can't parse the configuration file: " + path )
+		
+		return copy.deepcopy( config )
+	
 	def _Parse( self ):
 		"""Parses the config file. Raises ConfigParsingError, if the options in the file have values that don't match with the type defined by the option."""
 		
 		config = self._config
 		options = {}
-		for key, option in _OptionIterator( config ):
+		for key, option in _IterOptions( config ):
 			try:
 				value = self._Validate( option['value'], option['type'] )
 				options[key] = value
@@ -230,12 +289,50 @@ class Config(_Queries):
 		
 		return options
 	
+	def _LoadTemplate( self ):
+		"""Loads the template as yaml. Returns a copy of the cached template, since the config is modified after loading."""
+		
+		path = self._templatePath
+		try:
+			template = _ParseYamlFile( path )
+		except yaml.YAMLError:
+			raise TemplateParsingError( "Can't parse the template file: " + path )
+		except OSError:
+			raise MissingTemplateError( 'Missing template: ' + path )
+		
+		return copy.deepcopy( template )
+	
+	def _WriteCache( self, key, config ):
+		"""Writes the loaded config to the cache. The file is replaced atomically, so a partially written cache is never read. Failing to write the cache is not an error."""
+		
+		cachePath = os.path.dirname( self._cacheFilePath )
+		tempPath = None
+		try:
+			os.makedirs( cachePath, exist_ok=True )
+			fd, tempPath = tempfile.mkstemp( dir=cachePath )
+			with os.fdopen( fd, 'wb' ) as file:
+				pickle.dump( ( key, config ), file )
+			
+			os.replace( tempPath, self._cacheFilePath )
+			tempPath = None
+		
+		except ( OSError, pickle.PicklingError ):
+			pass
+		
+		# remove the temporary file, if it wasn't moved to the cache
+		finally:
+			if tempPath is not None:
+				try:
+					os.remove( tempPath )
+				except OSError:
+					pass
+	
 	def _WriteFile( self, config ):
 		"""Writes the config to a file in a neat and readable format."""
 		
 		with open( self._userConfigFilePath, 'w' ) as file:
-			written = []
-			for key, option in _OptionIterator( config ):
+			written = set()
+			for key, option in _IterOptions( config ):
 				keys = key.split('.')
 				indent = ''
 				i = 0
@@ -243,12 +340,12 @@ class Config(_Queries):
 					curKey = '.'.join( keys[:i+1] )
 					if not curKey in written:
 						file.write( indent + keys[i] + ':\n' )
-						written.append( curKey )
+						written.add( curKey )
 					
 					indent += '    '
 					i += 1
 				
-				dump = yaml.safe_dump( option )
+				dump = yaml.dump( option, Dumper=_Dumper )
 				lines = dump.split('\n')
 				for line in lines:
 					file.write( indent + line + '\n' )
@@ -256,15 +353,10 @@ class Config(_Queries):
 	def CreateFromTemplate( self ):
 		"""Creates a new config file from a template, and writes it to the default config path. Gives the user an option to edit the values."""
 		
-		try:
-			with open( self._templatePath, 'r' ) as file:
-				try:
-					config = yaml.safe_load( file )
-				except yaml.scanner.ScannerError:
-					raise TemplateParsingError( "Can't parse the template file: " + self._templatePath )
-			
-		except OSError:
-			raise MissingTemplateError( 'Missing template: ' + self._templatePath )
+		config = self._LoadTemplate()
+		
+		# look for an old config only when a new one is created, not on every start
+		self._oldConfigFilePath, self._oldVersion = self._FindOldPath()
 		
 		# always migrate the options, if an old config exists
 		if self._oldConfigFilePath:
@@ -290,7 +382,7 @@ class Config(_Queries):
 		except OSError:
 			print( 'No migration rules found, continuing without.' )
 		
-		for key, option in _OptionIterator( old ):
+		for key, option in _IterOptions( old ):
 			try:
 				# use migration rules for the keys
 				if key in rulebook['renamed'].keys():
@@ -325,83 +417,23 @@ class Config(_Queries):
 		else:
 			self.options = self._Parse()
 
-class _OptionIterator:
-	"""Iterates through the options in a given yaml representation of a config file."""
+def _IsOption( item ):
+	"""Check if the given item is an option. An option is a dictionary, which has the keys 'value' and 'type'. An option may also contain additional keys."""
 	
-	def __init__( self, config ):
-		self._config = config
-		self._keys = [ list( config.keys() ) ]
-		self._indices = [-1]
-	
-	def __iter__( self ):
-		return self
-	
-	def __next__( self ):
-		keys = self._keys
-		indices = self._indices
-		
-		# move to the next index in the index chain
-		indices[-1] += 1
-		while not indices[-1] < len( keys[-1] ):
-			# current key has been iterated
-			indices.pop()
-			keys.pop()
-			
-			# progress to the next item in the previous key
-			if len( indices ):
-				indices[-1] += 1
-			else:
-				raise StopIteration
-		
-		# search the current dictionary item for options
-		item = self._UseKeys( keys, indices )
-		while not self._IsOption( item ):
-			# the item is not a dictionary, move to next one
-			if type( item ) != dict:
-				return self.__next__()
-			
-			# add the new dictionary keys to the list of keys
-			keys.append( list( item.keys() ) )
-			indices.append( 0 )
-			item = self._UseKeys( keys, indices )
-		
-		keyList = self._MapKeys( keys, indices )
-		optionKey = '.'.join( keyList )
-		
-		return optionKey, item
+	return isinstance( item, dict ) and 'value' in item and 'type' in item
+
+def _IterOptions( config, prefix='' ):
+	"""Iterates through the options in a given yaml representation of a config file. Yields the dot separated key and the option."""
 	
-	def _IsOption( self, item ):
-		"""Check if the given item is an option. An option is a dictionary, which has the keys 'value' and 'type'. An option may also contain additional keys."""
+	for key, item in config.items():
+		# the item is not a dictionary, move to next one
+		if not isinstance( item, dict ):
+			continue
 		
-		# not a dictionary
-		if type( item ) != dict:
-			return False
+		optionKey = prefix + key
+		if _IsOption( item ):
+			yield optionKey, item
 		
-		keys = item.keys()
-		if 'value' in keys and 'type' in keys:
-			return True
+		# search the dictionary for options
 		else:
-			return False
-	
-	def _MapKeys( self, keys, indices ):
-		"""Map keys of nested dictionaries based on a list of indices. Return a list of keys corresponding to those given by the indices."""
-		
-		keyList = []
-		
-		for i in range( len(keys) ):
-			key = keys[i]
-			index = indices[i]
-			
-			keyList.append( key[index] )
-		
-		return keyList
-	
-	def _UseKeys( self, keys, indices ):
-		"""Uses a list of keys to find the current item in a nested config dictionary."""
-		
-		item = self._config
-		keyList = self._MapKeys( keys, indices )
-		for key in keyList:
-			item = item[key]
-		
-		return item
+			yield from _IterOptions( item, optionKey + '.' )
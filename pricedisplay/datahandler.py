@@ -1,39 +1,101 @@
 # -*- coding: UTF-8 -*-
 
 import datetime
+import functools
 import json
-import requests
+import math
+import operator
 
-from requests.exceptions import *
 from .exceptions import MissingOptionError
 from .exceptions import NoDataError, DataParsingError, DataRequestError
 
 __version__ = '0.6.1'
 
+_oneDay = datetime.timedelta( days=1 )
+_oneHour = datetime.timedelta( hours=1 )
+_GetDate = operator.itemgetter( 0 )
+
+# use the faster ciso8601 parser for the timestamps, if available
+try:
+	from ciso8601 import parse_datetime as _FromIsoFormat
+except ImportError:
+	_FromIsoFormat = datetime.datetime.fromisoformat
+
+# use the faster orjson parser, if available, it raises a subclass of JSONDecodeError
+try:
+	import orjson
+	_LoadJson = orjson.loads
+except ImportError:
+	_LoadJson = json.loads
+
+# ijson is needed only for streaming the data
+try:
+	import ijson
+except ImportError:
+	ijson = None
+
+def _DaysAround( today ):
+	"""Returns the days of the month for yesterday, today, and tomorrow."""
+	
+	yesterday = today - _oneDay
+	tomorrow = today + _oneDay
+	
+	return yesterday.day, today.day, tomorrow.day
+
 class PriceData:
 	"""Represents the price data and its statistics."""
 	
-	_hasData = False
-	low = None
-	high = None
-	average = None
-	
 	def __init__( self, prices ):
 		self._data = prices
+	
+	# the statistics are computed only when they are first needed
+	@functools.cached_property
+	def _hasData( self ):
+		"""Whether there is a price for any hour."""
 		
-		# filter out None for comparing prices
-		filtered = []
-		for price in prices:
-			if price != None:
-				filtered.append( price )
+		return any( price is not None for price in self._data )
+	
+	@functools.cached_property
+	def _stats( self ):
+		"""The lowest, highest and average price, computed in a single pass over the prices. All are None, if there are no prices."""
+		
+		low = math.inf
+		high = -math.inf
+		total = 0
+		count = 0
+		
+		for price in self._data:
+			if price is not None:
+				if price < low:
+					low = price
+				if price > high:
+					high = price
+				
+				total += price
+				count += 1
+		
+		if not count:
+			return None, None, None
+		
+		return low, high, round( total / count, 2 )
+	
+	@property
+	def low( self ):
+		"""The lowest price, or None if there are no prices."""
 		
-		if filtered:
-			self._hasData = True
-			
-			self.low = min( filtered )
-			self.high = max( filtered )
-			average = sum( filtered ) / len( filtered )
-			self.average = round( average, 2 )
+		return self._stats[0]
+	
+	@property
+	def high( self ):
+		"""The highest price, or None if there are no prices."""
+		
+		return self._stats[1]
+	
+	@property
+	def average( self ):
+		"""The average price rounded to two decimals, or None if there are no prices."""
+		
+		return self._stats[2]
 	
 	def __add__( self, obj ):
 		if type( obj ) == PriceData:
@@ -49,7 +111,7 @@ class PriceData:
 		return self._hasData
 	
 	def __getitem__( self, val ):
-		if type( val ) == int:
+		if isinstance( val, int ):
 			return self._data[val]
 		else:
 			data = self._data[val]
@@ -67,6 +129,8 @@ class PriceData:
 class DailyData:
 	"""Represents the price data for yesterday, today, and tomorrow."""
 	
+	__slots__ = ( '_data', 'yesterday', 'today', 'tomorrow', 'all' )
+	
 	def __init__( self, yesterday, today, tomorrow ):
 		self._data = [ yesterday, today, tomorrow ]
 		
@@ -91,17 +155,20 @@ class DailyData:
 	def Copy( self ):
 		"""Copies the data to a new object, so it cannot be replaced."""
 		
-		yesterday = self._data[0].copy()
-		today = self._data[1].copy()
-		tomorrow = self._data[2].copy()
+		# the prices are immutable, so a shallow copy of each list is enough
+		yesterday, today, tomorrow = self._data
 		
-		return DailyData( yesterday, today, tomorrow )
+		return DailyData( yesterday[:], today[:], tomorrow[:] )
 
 class PriceDataHandler:
-	"""Retrieves, parses and updates the price data from the specified source."""
+	"""Retrieves, parses and updates the price data from the specified source. The attribute tomorrowComplete tells, whether all the prices for tomorrow have been received."""
 	
 	_prices = None
-	_day = None
+	_days = None
+	_etag = None
+	_lastModified = None
+	_session = None
+	tomorrowComplete = False
 	
 	def __init__( self, options ):
 		try:
@@ -112,22 +179,34 @@ class PriceDataHandler:
 		except KeyError as err:
 			raise MissingOptionError( err.args )
 		
+		# the stream option was added after the config version, so older configs don't have it
+		stream = options.get( 'stream', False )
+		
+		self._isHTTP = self._source.lower().startswith('http')
+		
+		# streaming needs ijson, without it the data is read whole
+		self._stream = stream and ijson is not None
+		
+		# the message depends only on the field names, so it's built once
+		self._noPriceMessage = 'No ' + self._priceWithTaxField + ' or ' + self._priceNoTaxField + ' in data'
+		
 		self._prices = DailyData( 24*[None], 24*[None], 24*[None] )
 		
-		today = datetime.datetime.today()
-		self._day = today.day
+		self._days = _DaysAround( datetime.datetime.today() )
 	
 	def _ConvertToPriceList( self, data ):
 		"""Convert a list of ( date, price ) tuples to a list of prices. If data is missing, fill in None."""
 		if not len(data):
 			return 24*[None]
 		
-		# make sure the data is sorted by day and hour
-		data.sort()
+		# make sure the data is sorted by day and hour, so the latest of any rows for the same hour is kept
+		data.sort( key=_GetDate )
+		firstDate = data[0][0]
+		lastDate = data[-1][0]
 		
 		# determine DST offset from the acquired data if any
-		firstHourOffset = data[0][0].utcoffset()
-		lastHourOffset = data[-1][0].utcoffset()
+		firstHourOffset = firstDate.utcoffset()
+		lastHourOffset = lastDate.utcoffset()
 		delta = lastHourOffset - firstHourOffset
 		
 		dstOffset = delta.days*24 + delta.seconds/3600				# offset in hours
@@ -137,47 +216,46 @@ class PriceDataHandler:
 		# pad the price data with None
 		prices = hoursInDay*[None]
 		
+		# the hours are counted from the midnight of the first hour, subtracting the dates takes any DST change into account
+		midnight = firstDate.replace( hour=0, minute=0, second=0, microsecond=0 )
+		
 		# fill in the price data given as the argument
-		i = 0
-		while i < len( data ):
-			date, price = data[i]
-			
-			# find out how many hours it has been after midnight for the given hour
-			offset = firstHourOffset - date.utcoffset()
-			hourOffset = offset.days*24 + offset.seconds/3600
-			
-			hour = date.hour + hourOffset
-			hour = int( hour )
-			
-			# fill in the price data
+		for date, price in data:
+			hour = ( date - midnight ) // _oneHour
 			prices[hour] = price
-			i += 1
 		
 		return prices
 		
-	def _FilterDataByDay( self, data ):
-		"""Filters data based on day to ( date, price ) lists for yesterday, today, and tomorrow."""
+	def _FilterDataByDay( self, data, today=None ):
+		"""Filters data based on day to ( date, price ) lists for yesterday, today, and tomorrow. The current date can be given as an argument, otherwise the days are the ones set at midnight."""
 		
-		today = datetime.datetime.today()
-		tomorrow = today + datetime.timedelta( days=1 )
-		yesterday = today - datetime.timedelta( days=1 )
+		if today is None:
+			yesterdayDay, todayDay, tomorrowDay = self._days
+		else:
+			yesterdayDay, todayDay, tomorrowDay = _DaysAround( today )
 		
-		# split the data to days
+		# split the data to days, ignore any other days
 		dataToday = []
 		dataTomorrow = []
 		dataYesterday = []
 		
+		# map the days to the append methods of their lists, so the loop only needs a lookup and a call
+		days = {
+			yesterdayDay: dataYesterday.append,
+			todayDay: dataToday.append,
+			tomorrowDay: dataTomorrow.append
+		}
+		
+		# bind the methods used in the loop to locals
+		parse = self._ParseObject
+		getAppend = days.get
+		
 		for line in data:
-			date, price = self._ParseObject( line )
+			date, price = parse( line )
 			
-			if date.day == today.day:
-				dataToday.append( (date, price) )
-			
-			if date.day == tomorrow.day:
-				dataTomorrow.append( (date, price) )
-			
-			if date.day == yesterday.day:
-				dataYesterday.append( (date, price) )
+			append = getAppend( date.day )
+			if append is not None:
+				append( (date, price) )
 		
 		return dataYesterday, dataToday, dataTomorrow
 	
@@ -192,6 +270,7 @@ class PriceDataHandler:
 		pricesYesterday = self._ConvertToPriceList( dataYesterday )
 		
 		self._prices = DailyData( pricesYesterday, pricesToday, pricesTomorrow )
+		self.tomorrowComplete = not None in pricesTomorrow
 	
 	def _ParseObject( self, obj ):
 		"""Parses a json object to a datetime object and a two decimal price in cents."""
@@ -201,8 +280,8 @@ class PriceDataHandler:
 		priceNoTax = self._ParsePrice( obj, self._priceNoTaxField )
 		
 		# if neither price was found, raise parsing error
-		if priceWithTax == None and priceNoTax == None:
-			raise DataParsingError( 'No ' + self._priceWithTaxField + ' or ' + self._priceNoTaxField + ' in data' )
+		if priceWithTax is None and priceNoTax is None:
+			raise DataParsingError( self._noPriceMessage )
 		
 		# default to the price with tax if present in the data
 		if priceWithTax is not None:
@@ -211,7 +290,7 @@ class PriceDataHandler:
 			price = priceNoTax
 		
 		# negative price has no tax included
-		if priceNoTax != None and priceNoTax < 0:
+		if priceNoTax is not None and priceNoTax < 0:
 			price = priceNoTax
 		
 		return date, price
@@ -221,7 +300,7 @@ class PriceDataHandler:
 		
 		try:
 			dateTime = obj[ field ]
-			date = datetime.datetime.fromisoformat( dateTime )
+			date = _FromIsoFormat( dateTime )
 			
 		except KeyError:
 			raise DataParsingError( 'No ' + field + ' in data' )
@@ -234,42 +313,111 @@ class PriceDataHandler:
 	def _ParsePrice( self, obj, field ):
 		"""Extracts the price from the json object and rounds it to two decimals. If there is no specified field, return None instead of a parsing error."""
 		
+		# a missing price is common, so check for it without an exception
+		price = obj.get( field )
+		if price is None:
+			return None
+		
 		try:
-			price = obj[ field ]
 			price = round( 100*price, 2 )
-			
-		except KeyError:
-			price = None
-			
-		except ValueError:
+		
+		except ( TypeError, ValueError ):
 			raise DataParsingError( 'Price is not a number (' + field + ')' )
 		
 		return price
 	
-	def _RequestDataHTTP( self ):
-		"""Requests data with a http get."""
-		
+	def _GetHTTP( self, stream=False ):
+		"""Sends a http get to the source, asking for the data only if it has changed. Returns the response, or None if the server reports that the data hasn't changed since the last request."""
+		
+		# a local data file doesn't need requests
+		import requests
+		
+		# keep the connection to the server open between the updates
+		if self._session is None:
+			adapter = requests.adapters.HTTPAdapter( pool_connections=1, pool_maxsize=2 )
+			self._session = requests.Session()
+			self._session.mount( 'http://', adapter )
+			self._session.mount( 'https://', adapter )
+		
+		# ask the server to send the data only if it has changed
+		headers = {}
+		if self._etag:
+			headers['If-None-Match'] = self._etag
+		if self._lastModified:
+			headers['If-Modified-Since'] = self._lastModified
+		
+		resp = None
 		try:
-			resp = requests.get( self._source )
+			resp = self._session.get( self._source, headers=headers, timeout=( 5, 15 ), stream=stream )
 			resp.raise_for_status()
-			data = resp.json()
 		
-		# handle request errors
-		except (ConnectionError, HTTPError, Timeout, TooManyRedirects, RequestException ) as err:
+		# handle request errors, a streamed response keeps the connection until it's closed
+		except requests.exceptions.RequestException as err:
+			if resp is not None:
+				resp.close()
+			
 			raise DataRequestError( 'Error in retrieving the data: ' + self._source + '\n' + str(err) )
 		
+		if resp.status_code == 304:
+			resp.close()
+			return None
+		
+		return resp
+	
+	def _SaveValidators( self, resp ):
+		"""Saves the headers for checking whether the data has changed, after the data has been read successfully."""
+		
+		self._etag = resp.headers.get( 'ETag' )
+		self._lastModified = resp.headers.get( 'Last-Modified' )
+	
+	def _RequestDataHTTP( self ):
+		"""Requests data with a http get. Returns None, if the server reports that the data hasn't changed since the last request."""
+		
+		resp = self._GetHTTP()
+		if resp is None:
+			return None
+		
+		try:
+			data = _LoadJson( resp.content )
+			self._SaveValidators( resp )
+		
 		# handle json decoding errors
 		except ( json.decoder.JSONDecodeError ):
 			raise DataParsingError( "Can't decode json" )
 		
 		return data
 	
+	def _StreamDataHTTP( self ):
+		"""Streams data with a http get and parses it while it's received."""
+		
+		# the raw stream raises the errors of urllib3, which is loaded by requests
+		import urllib3
+		
+		resp = self._GetHTTP( stream=True )
+		if resp is None:
+			return
+		
+		try:
+			with resp:
+				resp.raw.decode_content = True
+				self._ParseData( ijson.items( resp.raw, 'item', use_float=True ) )
+			
+			self._SaveValidators( resp )
+		
+		# handle errors in reading the response
+		except urllib3.exceptions.HTTPError as err:
+			raise DataRequestError( 'Error in retrieving the data: ' + self._source + '\n' + str(err) )
+		
+		# handle json decoding errors
+		except ijson.JSONError:
+			raise DataParsingError( "Can't decode json" )
+	
 	def _LoadDataFile( self ):
 		"""Reads data from a file."""
 		
 		try:
-			with open( self._source, 'r' ) as file:
-				data = json.load( file )
+			with open( self._source, 'rb' ) as file:
+				data = _LoadJson( file.read() )
 		
 		#handle OS related errors
 		except OSError:
@@ -281,16 +429,38 @@ class PriceDataHandler:
 		
 		return data
 	
+	def _StreamDataFile( self ):
+		"""Streams data from a file and parses it while it's read."""
+		
+		try:
+			with open( self._source, 'rb' ) as file:
+				self._ParseData( ijson.items( file, 'item', use_float=True ) )
+		
+		#handle OS related errors
+		except OSError:
+			raise DataRequestError( 'No such file: ' + self._source )
+		
+		# handle json decoding errors
+		except ijson.JSONError:
+			raise DataParsingError( "Can't decode json" )
+	
 	def _RetrieveData( self ):
-		"""Retrieves data either by http request or from a local file."""
+		"""Retrieves data either by http request or from a local file. Returns None, if the data is unchanged."""
 		
-		if self._source.lower().startswith('http'):
+		if self._isHTTP:
 			return self._RequestDataHTTP()
 		else:
 			return self._LoadDataFile()
 	
+	def Close( self ):
+		"""Closes the connection to the data source, if one is open."""
+		
+		if self._session is not None:
+			self._session.close()
+			self._session = None
+	
 	def GetPrices( self ):
-		"""Returns the prices for yesterday, today, and tomorrow. Makes a deepcopy of the internal data structure to prevent accidental overwriting of the data."""
+		"""Returns the prices for yesterday, today, and tomorrow. Makes a copy of the internal data structure to prevent accidental overwriting of the data."""
 		
 		return self._prices.Copy()
 	
@@ -299,9 +469,22 @@ class PriceDataHandler:
 		
 		trash, yesterday, today = self._prices
 		self._prices = DailyData( yesterday, today, 24*[None] )
+		self._days = _DaysAround( datetime.datetime.today() )
+		self.tomorrowComplete = False
 	
 	def Update(self):
-		"""Retrieves new data from the source."""
+		"""Retrieves new data from the source. If streaming is enabled, the data is parsed while it's read."""
+		
+		if self._stream:
+			if self._isHTTP:
+				self._StreamDataHTTP()
+			else:
+				self._StreamDataFile()
+			
+			return
 		
 		data = self._RetrieveData()
-		self._ParseData( data )
+		
+		# the data is unchanged, if the server didn't send it
+		if data is not None:
+			self._ParseData( data )
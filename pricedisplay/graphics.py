@@ -2,6 +2,8 @@
 
 import curses
 import datetime
+import enum
+import functools
 import math
 import sparklines
 import time
@@ -12,12 +14,90 @@ from .exceptions import CollectionSizeError, WindowSizeError, WindowPositionErro
 
 __version__ = '0.7.0'
 
+def _PriceToColorFunction( low, high, pairs ):
+	"""Returns a function, which finds a curses color pair based on the given price (low, medium, high)."""
+	
+	noColor, lowColor, mediumColor, highColor = pairs[:4]
+	
+	def PriceToColor( price ):
+		if price is None:
+			return noColor
+		elif price < low:
+			return lowColor
+		elif price < high:
+			return mediumColor
+		else:
+			return highColor
+	
+	return PriceToColor
+
+@functools.lru_cache( maxsize=256 )
+def _FormatPrice( price ):
+	"""Formats price for display. Ensure two decimal places adding zeros if necessary. Pad with spaces on the left to align decimal point."""
+	
+	price = str( price )
+	i, d = price.split( '.' )
+	d = d.ljust( 2, '0' )
+	price = i + '.' + d
+	price = price.rjust( 6 )
+	
+	return price
+
+class _Layout( enum.IntEnum ):
+	"""The layouts of the price display. The values index the layout sizes and the layout methods."""
+	
+	MINIMAL = 0
+	HORIZONTAL = 1
+	VERTICAL = 2
+
+# the layout chosen by the preferred layout and whether the horizontal and vertical layouts fit in the content
+_layoutDecisions = {
+		( 'none', False, False ): _Layout.MINIMAL,
+		( 'none', False, True ): _Layout.VERTICAL,
+		( 'none', True, False ): _Layout.HORIZONTAL,
+		( 'none', True, True ): _Layout.HORIZONTAL,
+		
+		( 'minimal', False, False ): _Layout.MINIMAL,
+		( 'minimal', False, True ): _Layout.MINIMAL,
+		( 'minimal', True, False ): _Layout.MINIMAL,
+		( 'minimal', True, True ): _Layout.MINIMAL,
+		
+		( 'horizontal', False, False ): _Layout.MINIMAL,
+		( 'horizontal', False, True ): _Layout.VERTICAL,
+		( 'horizontal', True, False ): _Layout.HORIZONTAL,
+		( 'horizontal', True, True ): _Layout.HORIZONTAL,
+		
+		( 'vertical', False, False ): _Layout.MINIMAL,
+		( 'vertical', False, True ): _Layout.VERTICAL,
+		( 'vertical', True, False ): _Layout.HORIZONTAL,
+		( 'vertical', True, True ): _Layout.VERTICAL
+	}
+
+@functools.lru_cache( maxsize=64 )
+def _DecideLayout( contentSize, preferred, verticalSize, horizontalSize, minimalSize ):
+	"""Chooses the layout based on user settings and the sizes of the content and the layouts. The sizes are given as tuples, so the choice can be cached for the terminal sizes already seen. Returns the layout and its size."""
+	
+	contentHeight, contentWidth = contentSize
+	verticalHeight, verticalWidth = verticalSize
+	horizontalHeight, horizontalWidth = horizontalSize
+	
+	canUseVertical = verticalHeight <= contentHeight and verticalWidth <= contentWidth
+	canUseHorizontal = horizontalHeight <= contentHeight and horizontalWidth <= contentWidth
+	
+	# any other preference is treated as no preference
+	key = ( preferred, canUseHorizontal, canUseVertical )
+	if key not in _layoutDecisions:
+		key = ( 'none', canUseHorizontal, canUseVertical )
+	
+	layout = _layoutDecisions[ key ]
+	sizes = ( minimalSize, horizontalSize, verticalSize )
+	
+	return layout, sizes[ layout ]
+
 class Point:
 	"""Represents a point on the terminal screen."""
 	
-	y = 0
-	x = 0
-	pos = ( 0,0 )
+	__slots__ = ( 'y', 'x', 'pos' )
 	
 	def __init__( self, pos ):
 		self.y = pos[0]
@@ -36,9 +116,7 @@ class Point:
 class Size:
 	"""Represents the size of an object."""
 	
-	height = 0
-	width = 0
-	size = ( 0,0 )
+	__slots__ = ( 'height', 'width', 'size' )
 	
 	def __init__( self, size ):
 		self.height = size[0]
@@ -54,22 +132,25 @@ class Size:
 	def __str__( self ):
 		return 'Size( ' + str(self.size) + ' )'
 
-class BBox( Point, Size ):
+class BBox( Point ):
 	"""Represents the bounding box of an object. Two bounding boxes can be added returning a bounding box encompassing them both."""
 	
-	bottom = 0
-	left = 0
-	right = 0
-	top = 0
+	# two bases with slots can't be combined, so the size attributes are slotted here
+	__slots__ = ( 'height', 'width', 'size', 'bottom', 'left', 'right', 'top', '_attrs' )
 	
 	def __init__( self, size, pos ):
 		Point.__init__( self, pos )
-		Size.__init__( self, size )
+		
+		self.height = size[0]
+		self.width = size[1]
+		self.size = size
 		
 		self.bottom = self.y + self.height
 		self.left = self.x
 		self.right = self.x + self.width
 		self.top = self.y
+		
+		self._attrs = tuple( size ) + tuple( pos )
 	
 	def __add__( self, bb ):
 		bottom = max( self.bottom, bb.bottom )
@@ -103,12 +184,10 @@ class BBox( Point, Size ):
 		return True
 	
 	def __getitem__( self, index ):
-		attrs = tuple( self.size ) + tuple( self.pos )
-		return attrs[index]
+		return self._attrs[index]
 	
 	def __len__( self ):
-		attrs = self.size + self.pos
-		return len( attrs )
+		return len( self._attrs )
 	
 	def __str__( self ):
 		return 'BBox( ' + str(self.size) + ', ' + str(self.pos) + ' )'
@@ -155,6 +234,11 @@ class _PriceDisplayWindow( _DisplayWindow ):
 	"""Base class for price display windows. Defines helper functions for color coding prices and taking into account DST changes."""
 	
 	minSize = Size( ( 0,0 ) )
+	_slow = False
+	_delay = 0.01
+	_colorPairs = None
+	_colorFunction = None
+	_lastSignature = None
 	
 	def __init__( self, size, pos, options, parent=None ):
 		self._low, self._high = options['limits']
@@ -182,19 +266,60 @@ class _PriceDisplayWindow( _DisplayWindow ):
 		
 		return index
 	
-	def _PriceToColor( self, price ):
-		"""Finds a curses color pair based on the given price (low, medium, high)."""
+	def _AddRuns( self, line, attrs ):
+		"""Adds a line with one call for each run of characters with the same attribute."""
 		
-		if price == None:
-			color = 0
-		elif price < self._low:
-			color = 1
-		elif price < self._high:
-			color = 2
-		else:
-			color = 3
+		addString = self._AddString
+		
+		start = 0
+		attr = attrs[0] if attrs else 0
+		for i in range( 1, len( line ) ):
+			if attrs[i] != attr:
+				addString( line[ start : i ], attr )
+				start = i
+				attr = attrs[i]
+		
+		if line:
+			addString( line[ start : ], attr )
+	
+	def _AddString( self, text, attr=0 ):
+		"""Adds a string with the given attribute. When simulating a slow terminal, the string is drawn right away with a delay for each character."""
+		
+		self._win.addstr( text, attr )
+		if self._slow:
+			self._FlushSlow( len( text ) )
+	
+	def _FlushSlow( self, count ):
+		"""Draws the window and waits the delay for the given number of characters, when simulating a slow terminal."""
+		
+		self._win.refresh()
+		time.sleep( self._delay * count )
+	
+	def _IsUnchanged( self, signature ):
+		"""Checks whether the window would be drawn the same as in the last update. The signature is everything the content depends on, and it's saved for the next update."""
+		
+		if signature == self._lastSignature:
+			return True
+		
+		self._lastSignature = signature
+		return False
+	
+	def _ColorPairs( self ):
+		"""Returns the curses color pairs used by the display. They can only be read after curses has started colors, so they are cached on first use, when the function coloring the prices is also built."""
+		
+		pairs = self._colorPairs
+		if pairs is None:
+			pairs = tuple( curses.color_pair( i ) for i in range( 5 ) )
+			self._colorPairs = pairs
+			self._colorFunction = _PriceToColorFunction( self._low, self._high, pairs )
+		
+		return pairs
+	
+	def _ColorFunction( self ):
+		"""Returns the function, which finds a curses color pair based on the given price (low, medium, high)."""
 		
-		return curses.color_pair( color )
+		self._ColorPairs()
+		return self._colorFunction
 
 ###  display for the price graph  ###
 
@@ -225,6 +350,9 @@ class Graph( _PriceDisplayWindow ):
 		self._slow = opts['slowTerminal']
 		self._delay = opts['terminalDelay']
 		pastHours = opts['pastHours']
+		
+		# the symbols drawn on the graph are not colored
+		self._symbols = frozenset( self._carets + self._extremes + tuple( self._missing ) )
 		width = opts['width']
 		
 		# normalize the number of past hours to fit in the space allowed
@@ -236,6 +364,10 @@ class Graph( _PriceDisplayWindow ):
 		
 		self._pastHours = pastHours
 		
+		# the graph shows one hour per column, except for the last one
+		self._blankLine = ' '*( width - 1 )
+		self._nonePadding = [None]*( width - 1 )
+		
 		h = opts['height']
 		w = opts['width']
 		size = Size( ( h, w ) )
@@ -245,11 +377,15 @@ class Graph( _PriceDisplayWindow ):
 		"""Adds carets to indicate the current hour in the sparklines."""
 		
 		pos, neg = lines
-		hours = len( ( pos + neg )[0] )
+		blankLine = self._blankLine
 		
 		# add an empty line to the beginning and end to always fit the carets
-		pos = [ ' '*hours ] + pos
-		neg = neg + [ ' '*hours ]
+		pos = [ blankLine ] + pos
+		neg = neg + [ blankLine ]
+		
+		# split the lines to lists of characters, so the symbols can be placed without copying the lines
+		pos = [ list( line ) for line in pos ]
+		neg = [ list( line ) for line in neg ]
 		
 		return pos, neg
 	
@@ -292,28 +428,21 @@ class Graph( _PriceDisplayWindow ):
 			return lines
 		
 		if len( lines ) == 1:
-			lines[0] = lines[0][ : hour ] + symbol + lines[0][ hour+1 : ]
+			lines[0][ hour ] = symbol
 			return lines
 		
-		i = 0
-		while i < len( lines ) - 1:
-			line = lines[i]
-			next = lines[i + 1]
-			
-			# last empty space for the symbol, if price is positive
-			if line[ hour ] == ' ' and next[ hour ] != ' ':
-				symbolLine = line[ : hour ] + symbol + line[ hour+1 : ]
-				lines[i] = symbolLine
-				break
-			
-			# last possible line for the symbol
-			if i == len( lines ) - 2:
-				symbolLine = next[ : hour ] + symbol + next[ hour+1 : ]
-				lines[-1] = symbolLine
+		column = ''.join( line[ hour ] for line in lines )
+		
+		# last empty space for the symbol, if price is positive
+		for i in range( len( column ) - 1 ):
+			if column[i] == ' ' and column[i + 1] != ' ':
 				break
-			
-			i += 1
 		
+		# last possible line for the symbol
+		else:
+			i = len( column ) - 1
+		
+		lines[i][ hour ] = symbol
 		return lines
 	
 	def _AddSymbolBelow( self, lines, hour, symbol ):
@@ -324,58 +453,57 @@ class Graph( _PriceDisplayWindow ):
 		
 		# all prices are positive
 		if len( lines ) == 1:
-			lines[0] = lines[0][ : hour ] + symbol + lines[0][ hour+1 : ]
+			lines[0][ hour ] = symbol
 			return lines
 		
 		# one negative line
 		if len( lines ) == 2:
 			# price is positive
 			if lines[0][ hour ] in (' ', '█'):	# right character is extended Asian character
-				lines[0] = lines[0][ : hour ] + symbol + lines[0][ hour+1 : ]
+				lines[0][ hour ] = symbol
 				return lines
 			
 			# small negative price
 			else:
-				lines[1] = lines[1][ : hour ] + symbol + lines[1][ hour+1 : ]
+				lines[1][ hour ] = symbol
 				return lines
 		
-		i = iMax = len( lines ) - 2
+		column = ''.join( line[ hour ] for line in lines )
+		
+		i = iMax = len( column ) - 2
 		while i > 0:
-			prev = lines[i + 1]
-			cur = lines[i]
-			next = lines[i - 1]
+			prev = column[i + 1]
+			cur = column[i]
+			next = column[i - 1]
 			
 			# first possible line for the symbol, if negative price extends all the way down
-			if i == iMax and cur[ hour ] != ' ' and next[ hour ] == ' ':
-				symbolLine = prev[ : hour ] + symbol + prev[ hour+1 : ]
-				lines[i + 1] = symbolLine
+			if i == iMax and cur != ' ' and next == ' ':
+				symbolLine = i + 1
 				break
 			
 			# first empty space under negative sparkline on current hour
-			if prev[ hour ] != ' ' and cur[ hour ] != ' ' and next[ hour ] == ' ':
-				symbolLine = prev[ : hour ] + symbol + prev[ hour+1 : ]
-				lines[i + 1] = symbolLine
+			if prev != ' ' and cur != ' ' and next == ' ':
+				symbolLine = i + 1
 				break
 			
 			# last possible lines for the symbol
 			if i == 1:
 				# price is positive
-				if next[ hour ] in (' ', '█'):	# right character is extended Asian character
-					symbolLine = next[ : hour ] + symbol + next[ hour+1 : ]
-					lines[0] = symbolLine
+				if next in (' ', '█'):	# right character is extended Asian character
+					symbolLine = 0
 					break
 				
 				# small negative price
 				else:
-					symbolLine = cur[ : hour ] + symbol + cur[ hour+1 : ]
-					lines[1] = symbolLine
+					symbolLine = 1
 					break
 			
 			i -= 1
 		
+		lines[ symbolLine ][ hour ] = symbol
 		return lines
 	
-	def _AddLowestMarker( self, lines, priceData ):
+	def _AddLowestMarker( self, lines, priceData, curHour ):
 		"""Adds a marker for the lowest price today."""
 		
 		symbol = self._extremes[0]
@@ -384,8 +512,6 @@ class Graph( _PriceDisplayWindow ):
 		low = priceData.today.low
 		hour = priceData.today.index( low )
 		
-		hoursInDay = len( priceData.today )
-		curHour = self._CurrentHourIndex( hoursInDay )
 		index = hour - curHour + self._pastHours
 		
 		# don't add the marker for current hour
@@ -397,7 +523,7 @@ class Graph( _PriceDisplayWindow ):
 		
 		return pos, neg
 	
-	def _AddHighestMarker( self, lines, priceData ):
+	def _AddHighestMarker( self, lines, priceData, curHour ):
 		"""Adds a marker for the highest price today."""
 		
 		symbol = self._extremes[1]
@@ -406,8 +532,6 @@ class Graph( _PriceDisplayWindow ):
 		high = priceData.today.high
 		hour = priceData.today.index( high )
 		
-		hoursInDay = len( priceData.today )
-		curHour = self._CurrentHourIndex( hoursInDay )
 		index = hour - curHour + self._pastHours
 		
 		# don't add the marker for current hour
@@ -419,24 +543,16 @@ class Graph( _PriceDisplayWindow ):
 		
 		return pos, neg
 	
-	def _AddMissingSymbol( self, lines, visiblePrices ):
+	def _AddMissingSymbol( self, lines, missingHours ):
 		"""Adds a symbol for missing prices."""
 		
 		pos, neg = lines
-		hour = 0
-		while hour < len( visiblePrices ):
-			if visiblePrices[hour] == None:
-				if len( pos ) > 1:
-					line = pos[-1]
-					line = line[ : hour ] + self._missing + line[ hour+1 : ]
-					pos[-1] = line
-				
-				else:
-					line = neg[0]
-					line = line[ : hour ] + self._missing + line[ hour+1 : ]
-					neg[0] = line
+		for hour in missingHours:
+			if len( pos ) > 1:
+				pos[-1][ hour ] = self._missing
 			
-			hour += 1
+			else:
+				neg[0][ hour ] = self._missing
 		
 		return pos, neg
 	
@@ -447,83 +563,88 @@ class Graph( _PriceDisplayWindow ):
 		pos, neg = lines
 		
 		# add the upper caret line
-		win.addstr( pos[0] )
+		win.addstr( ''.join( pos[0] ) )
 		win.addstr( '\n' )
 		
 		self._AddPositiveLines( pos, colors, prices )
 		self._AddNegativeLines( neg, colors, prices )
 		
 		# add the lower caret line
-		win.addstr( neg[-1] )
+		win.addstr( ''.join( neg[-1] ) )
 	
 	def _AddNegativeLines( self, lines, colors, prices ):
 		"""Adds negative lines to the graph."""
 		
-		win = self._win
-		symbols = self._carets + self._extremes + tuple( self._missing )
+		addstr = self._win.addstr
+		addRuns = self._AddRuns
+		symbols = self._symbols
+		reverse = curses.A_REVERSE
 		
 		for line in lines[:-1]:
-			for hour in range( len(line) ):
-				price = prices[hour]
-				if line[hour] not in symbols and price != None and price < 0:
-					win.addstr( line[hour], colors[hour] | curses.A_REVERSE )
-				else:
-					win.addstr( line[hour] )
-				
-				if self._slow:
-					win.refresh()
-					time.sleep(self._delay)
+			# the bars of negative prices are drawn reversed, so they hang down from the zero line
+			attrs = [
+				color | reverse if char not in symbols and price is not None and price < 0 else 0
+				for char, color, price in zip( line, colors, prices )
+			]
 			
-			win.addstr( '\n' )
+			addRuns( ''.join( line ), attrs )
+			addstr( '\n' )
 	
 	def _AddPositiveLines( self, lines, colors, prices ):
 		"""Adds positive lines to the graph."""
 		
-		win = self._win
-		symbols = self._carets + self._extremes + tuple( self._missing )
+		addstr = self._win.addstr
+		addRuns = self._AddRuns
+		symbols = self._symbols
 		
 		for line in lines[1:]:
-			for hour in range( len(line) ):
-				if line[hour] not in symbols:
-					win.addstr( line[hour], colors[hour] )
-				else:
-					win.addstr( line[hour] )
-				
-				if self._slow:
-					win.refresh()
-					time.sleep(self._delay)
+			# the symbols are drawn without colors
+			attrs = [ 0 if char in symbols else color for char, color in zip( line, colors ) ]
 			
-			win.addstr( '\n' )
+			addRuns( ''.join( line ), attrs )
+			addstr( '\n' )
 	
-	def _GetColors( self, visiblePrices ):
-		"""Gets the colors for the visible price data based on high and low prices."""
+	def _AnalyzePrices( self, visiblePrices ):
+		"""Splits the visible prices to positive and negative prices, filling in None for missing values, and finds their limits, colors, and the missing hours in a single pass."""
 		
-		hours = len( visiblePrices )
+		posPrices = []
+		negPrices = []
 		colors = []
-		for hour in range( hours ):
-			price = visiblePrices[ hour ]
-			color = self._PriceToColor( price )
-			
-			colors.append( color )
+		missingHours = []
 		
-		return colors
-	
-	def _GetLimits( self, visiblePrices ):
-		"""Find the minimum and maximum for the visible prices."""
-		
-		# filter out None for comparing prices
-		filteredPrices = []
-		for price in visiblePrices:
-			if price != None:
-				filteredPrices.append( price )
+		# zero is included in the limits for better visualization of prices
+		minimum = 0
+		maximum = 0
 		
-		# add zero for better visualization of prices
-		filteredPrices += [0]
+		priceToColor = self._ColorFunction()
+		for hour, price in enumerate( visiblePrices ):
+			colors.append( priceToColor( price ) )
+			
+			if price is None:
+				posPrices.append( None )
+				negPrices.append( None )
+				missingHours.append( hour )
+			
+			elif price > 0:
+				posPrices.append( price )
+				negPrices.append( None )
+				if price > maximum:
+					maximum = price
+			
+			elif price < 0:
+				posPrices.append( None )
+				negPrices.append( price )
+				if price < minimum:
+					minimum = price
+			
+			else:
+				posPrices.append( None )
+				negPrices.append( None )
 		
-		minimum = min( filteredPrices )
-		maximum = max( filteredPrices )
+		splitPrices = posPrices, negPrices
+		limits = minimum, maximum
 		
-		return minimum, maximum
+		return splitPrices, limits, colors, missingHours
 	
 	def _GetScaledLineParameters( self, limits ):
 		"""Find the scaled parameters, when there are both positive and negative prices."""
@@ -607,11 +728,10 @@ class Graph( _PriceDisplayWindow ):
 		
 		return sparks
 		
-	def _GetSparklines( self, visiblePrices ):
-		"""Gets the sparklines for visible prices."""
+	def _GetSparklines( self, splitPrices, limits ):
+		"""Gets the sparklines for the visible prices split to positive and negative prices."""
 		
-		limits = self._GetLimits( visiblePrices )
-		posPrices, negPrices = self._SplitPrices( visiblePrices )
+		posPrices, negPrices = splitPrices
 		posParams, negParams = self._GetLineParameters( limits )
 		
 		posSparks = self._GetPositiveSparklines( posPrices, *posParams )
@@ -619,15 +739,11 @@ class Graph( _PriceDisplayWindow ):
 		
 		return posSparks, negSparks
 	
-	def _GetVisiblePrices( self, priceData ):
-		"""Gets the prices, which are visible taking into account dst and the number of past hours to show. Returns a list of the visible prices."""
+	def _GetVisiblePrices( self, priceData, index ):
+		"""Gets the prices, which are visible taking into account dst and the number of past hours to show. The index of the current hour is given as an argument. Returns a list of the visible prices."""
 		
 		prices = priceData.all
 		pastHours = self._pastHours
-		curHour = pastHours + 1
-		
-		hours = len( priceData.today )
-		index = self._CurrentHourIndex( hours )
 		
 		start = len( priceData.yesterday ) + index - pastHours
 		end = start + self._size.width - 1
@@ -636,55 +752,39 @@ class Graph( _PriceDisplayWindow ):
 		
 		# pad the prices with None to the width of the window
 		padding = self._size.width - 1 - len( visiblePrices )
-		visiblePrices = visiblePrices + [None]*padding
+		visiblePrices = visiblePrices + self._nonePadding[ :padding ]
 		
 		return visiblePrices
 	
-	def _SplitPrices( self, visiblePrices ):
-		"""Splits the prices to positive and negative lists, filling in None for missing values."""
-		
-		# split prices to positive and negative prices
-		posPrices = []
-		negPrices = []
-		for price in visiblePrices:
-			if price == None:
-				posPrices.append( None )
-				negPrices.append( None )
-			
-			else:
-				if price > 0:
-					posPrices.append( price )
-					negPrices.append( None )
-				
-				if price < 0:
-					posPrices.append( None )
-					negPrices.append( price )
-				
-				if price == 0:
-					posPrices.append( None )
-					negPrices.append( None )
-		
-		return posPrices, negPrices
-	
 	def Update( self, priceData ):
 		"""Updates the graph, taking into account the changes in dst."""
 		
 		win = self._win
-		visiblePrices = self._GetVisiblePrices( priceData )
-		lines = self._GetSparklines( visiblePrices )
+		
+		# find the current hour once for the whole update
+		curHour = self._CurrentHourIndex( len( priceData.today ) )
+		
+		# the graph depends only on the prices and the current hour
+		if self._IsUnchanged( ( curHour, priceData ) ):
+			return
+		
+		visiblePrices = self._GetVisiblePrices( priceData, curHour )
+		splitPrices, limits, colors, missingHours = self._AnalyzePrices( visiblePrices )
+		
+		lines = self._GetSparklines( splitPrices, limits )
 		lines = self._AddPadding( lines )
 		
 		if self._extremesVisible:
-			lines = self._AddHighestMarker( lines, priceData )
-			lines = self._AddLowestMarker( lines, priceData )
+			lines = self._AddHighestMarker( lines, priceData, curHour )
+			lines = self._AddLowestMarker( lines, priceData, curHour )
 		
-		lines = self._AddMissingSymbol( lines, visiblePrices )
+		lines = self._AddMissingSymbol( lines, missingHours )
 		lines = self._AddCarets( lines )
-		colors = self._GetColors( visiblePrices )
 		
-		win.clear()
+		# erase instead of clear, so curses only redraws the changed cells
+		win.erase()
 		self._AddLines( lines, colors, visiblePrices )
-		win.refresh()
+		win.noutrefresh()
 
 ###  text based display windows for price details  ###
 
@@ -720,75 +820,38 @@ class _DetailWindow( _PriceDisplayWindow ):
 			self._AddMissingDetail( name, linebreak )
 	
 	def _AddHeading( self, heading ):
-		win = self._win
-		
-		for s in heading:
-			win.addstr( s, curses.color_pair(4) )
-			if self._slow:
-				win.refresh()
-				time.sleep(self._delay)
-		
-		win.addstr( '\n' )
+		self._AddString( heading, self._ColorPairs()[4] )
+		self._win.addstr( '\n' )
 	
 	def _AddExistingDetail( self, name, price, linebreak=True, textStyle=None ):
 		"""Adds a detail with a name and price, formatted for the display."""
 		
-		win = self._win
 		n = name.ljust( 10 )
 		p = self._FormatPrice( price )
-		c = self._PriceToColor( price )
-		
-		for s in n:
-			if textStyle:
-				win.addstr( s, textStyle )
-			else:
-				win.addstr( s )
-			
-			if self._slow:
-				win.refresh()
-				time.sleep(self._delay)
+		c = self._ColorFunction()( price )
 		
-		for s in p:
-			win.addstr( s, c | curses.A_BOLD )
-			if self._slow:
-				win.refresh()
-				time.sleep(self._delay)
+		self._AddString( n, textStyle or 0 )
+		self._AddString( p, c | curses.A_BOLD )
 		
 		if linebreak:
-			win.addstr( '\n' )
+			self._win.addstr( '\n' )
 	
 	def _AddMissingDetail( self, name, linebreak=True ):
 		"""Adds a detail when price is missing."""
 		
-		win = self._win
 		n = name.ljust( 10 )
 		p = self._missing.rjust( 6 )
 		
-		for s in n:
-			win.addstr( s )
-			if self._slow:
-				win.refresh()
-				time.sleep(self._delay)
-		
-		for s in p:
-			win.addstr( s, curses.A_BOLD )
-			if self._slow:
-				win.refresh()
-				time.sleep(self._delay)
+		self._AddString( n )
+		self._AddString( p, curses.A_BOLD )
 		
 		if linebreak:
-			win.addstr( '\n' )
+			self._win.addstr( '\n' )
 	
 	def _FormatPrice( self, price ):
-		"""Formats price for display. Ensure two decimal places adding zeros if necessary. Pad with spaces on the left to align decimal point."""
+		"""Formats price for display. The prices change rarely, so the formatted strings are cached by the price rounded to two decimals."""
 		
-		price = str( price )
-		i, d = price.split( '.' )
-		d = d.ljust( 2, '0' )
-		price = i + '.' + d
-		price = price.rjust( 6 )
-		
-		return price
+		return _FormatPrice( round( price, 2 ) )
 	
 	def _Normalize( self, var, limits=[ 0, 24 ] ):
 		"""Normalize the variable to be between limits."""
@@ -822,8 +885,7 @@ class DetailsCurrent( _DetailWindow ):
 		
 		self._AddDetail( 'hour:', cur )
 	
-	def _AddNightAverage( self, prices ):
-		now = datetime.datetime.now()
+	def _AddNightAverage( self, prices, now ):
 		start, end = self._night
 		if now.hour < end:
 			night = prices.yesterday[ start : ] + prices.today[ : end ]
@@ -836,18 +898,22 @@ class DetailsCurrent( _DetailWindow ):
 		"""Updates the displayed price."""
 		
 		now = datetime.datetime.now()
+		index = self._CurrentHourIndex( len( prices.today ) )
+		if self._IsUnchanged( ( now.hour, index, prices ) ):
+			return
+		
 		start, end = self._day
 		win = self._win
-		win.clear()
+		win.erase()
 		
 		self._AddHeading( 'CURRENT' )
 		self._AddHour( prices )
 		if start <= now.hour and now.hour < end:
 			self._AddDayAverage( prices )
 		else:
-			self._AddNightAverage( prices )
+			self._AddNightAverage( prices, now )
 		
-		win.refresh()
+		win.noutrefresh()
 
 class DetailsNext( _DetailWindow ):
 	"""Displays the price for the current hour."""
@@ -857,23 +923,21 @@ class DetailsNext( _DetailWindow ):
 	def __init__( self, pos, options, parent=None ):
 		_DetailWindow.__init__( self, pos, self.minSize, options, parent )
 	
-	def _AddAverages( self, prices ):
+	def _AddAverages( self, prices, now ):
 		win = self._win
 		start, end = self._day
-		now = datetime.datetime.now()
 		if start <= now.hour and now.hour < end:
-			self._AddNightAverage( prices )
+			self._AddNightAverage( prices, now )
 			win.addstr( '\n' )
-			self._AddDayAverage( prices )
+			self._AddDayAverage( prices, now )
 		
 		else:
-			self._AddDayAverage( prices )
+			self._AddDayAverage( prices, now )
 			win.addstr( '\n' )
-			self._AddNightAverage( prices )
+			self._AddNightAverage( prices, now )
 	
-	def _AddDayAverage( self, prices ):
+	def _AddDayAverage( self, prices, now ):
 		start, end = self._day
-		now = datetime.datetime.now()
 		if prices.tomorrow:
 			day = prices.tomorrow[ start : end ]
 			self._AddDetail( 'day:', day.average, False )
@@ -894,9 +958,8 @@ class DetailsNext( _DetailWindow ):
 		
 		self._AddDetail( 'hour:', next )
 	
-	def _AddNightAverage( self, prices ):
+	def _AddNightAverage( self, prices, now ):
 		start, end = self._night
-		now = datetime.datetime.now()
 		if prices.tomorrow and now.hour < start:
 			night = prices.today[ start : ] + prices.tomorrow[ : end ]
 			self._AddDetail( 'night:', night.average, False )
@@ -907,12 +970,18 @@ class DetailsNext( _DetailWindow ):
 	def Update( self, prices ):
 		"""Updates the displayed price."""
 		
+		# read the time once for the whole update
+		now = datetime.datetime.now()
+		index = self._CurrentHourIndex( len( prices.today ) )
+		if self._IsUnchanged( ( now.hour, index, prices ) ):
+			return
+		
 		win = self._win
-		win.clear()
+		win.erase()
 		self._AddHeading( 'NEXT' )
 		self._AddHour( prices )
-		self._AddAverages( prices )
-		win.refresh()
+		self._AddAverages( prices, now )
+		win.noutrefresh()
 
 class DetailsToday( _DetailWindow ):
 	"""Displays the lowest, highest, and average price for today."""
@@ -933,11 +1002,15 @@ class DetailsToday( _DetailWindow ):
 	def Update( self, prices ):
 		"""Updates the displayed prices."""
 		
+		# the prices don't depend on the time of day
+		if self._IsUnchanged( ( prices, ) ):
+			return
+		
 		win = self._win
-		win.clear()
+		win.erase()
 		self._AddHeading( 'TODAY' )
 		self._AddPrices( prices )
-		win.refresh()
+		win.noutrefresh()
 
 class DetailsTomorrow( _DetailWindow ):
 	"""Displays the lowest, highest, and average price for tomorrow."""
@@ -958,11 +1031,15 @@ class DetailsTomorrow( _DetailWindow ):
 	def Update( self, prices ):
 		"""Updates the displayed prices."""
 		
+		# the prices don't depend on the time of day
+		if self._IsUnchanged( ( prices, ) ):
+			return
+		
 		win = self._win
-		win.clear()
+		win.erase()
 		self._AddHeading( 'TOMORROW' )
 		self._AddPrices( prices )
-		win.refresh()
+		win.noutrefresh()
 
 ###  collections of subwindows for structuring the screen  ###
 
@@ -1052,7 +1129,7 @@ class _Collection( _DisplayWindow ):
 		return Point( pos )
 	
 	def Update( self, prices ):
-		"""Updates the display."""
+		"""Updates the display. The subwindows are only copied to the virtual screen, call curses.doupdate() to draw them."""
 		
 		for sub in self._subs:
 			sub.Update( prices )
@@ -1133,6 +1210,19 @@ class PriceDisplay( _SpacedCollection ):
 	_margin = Size( ( 1, 3 ) )
 	_padding = Size( ( 1, 3 ) )
 	
+	# the layout sizes depend only on the padding, so they are shared by all the displays
+	_sizeCache = {}
+	
+	# the elements of the layouts in the normal and reversed order
+	_horizontalElems = ( ( Graph, VerticalDetails ), )
+	_horizontalElemsReversed = ( ( VerticalDetails, Graph ), )
+	_verticalElems = ( ( Graph, ), ( HorizontalDetails, ) )
+	_verticalElemsReversed = ( ( HorizontalDetails, ), ( Graph, ) )
+	
+	# the graph size set by the layouts, leave an extra line for the lower graph caret in the horizontal layout
+	_horizontalGraphHeight = VerticalDetails.minSize.height + 1
+	_verticalGraphWidth = HorizontalDetails.minSize.width
+	
 	def __init__( self, pos, options, parent=None ):
 		pad = self._padding
 		
@@ -1143,75 +1233,39 @@ class PriceDisplay( _SpacedCollection ):
 		parSize = Size( parent.getmaxyx() )
 		contentHeight = parSize.height - 2*pad.height
 		contentWidth = parSize.width - 2*pad.width
-		contentSize = Size( ( contentHeight, contentWidth ) )
 		
 		# find the layout and size based on available space and user options
-		layout, size = self._ChooseLayout( contentSize, options['preferred'] )
-		self._layout = layout
+		createLayout, size = self._ChooseLayout( contentHeight, contentWidth, options['preferred'] )
 		
 		# init the collection and create layout
 		_SpacedCollection.__init__( self, pos, size, self._margin, self._padding, options, parent )
-		self._CreateLayout( options )
+		createLayout( options )
 	
-	def _ChooseLayout( self, contentSize, preferred ):
-		"""Chooses the layout based on user settings and size constraints set by the parent window."""
-		
-		contBB = BBox( contentSize, ( 0,0 ) )
+	def _ChooseLayout( self, contentHeight, contentWidth, preferred ):
+		"""Chooses the layout based on user settings and size constraints set by the parent window. Returns the method creating the layout and the size of the layout."""
 		
 		verticalSize = self._VerticalSize()
 		horizontalSize = self._HorizontalSize()
 		minimalSize = Graph.minSize
 		
-		vertBB = BBox( verticalSize, ( 0,0 ) )
-		horBB = BBox( horizontalSize, ( 0,0 ) )
-		
-		canUseVertical = vertBB in contBB
-		canUseHorizontal = horBB in contBB
+		contentSize = ( contentHeight, contentWidth )
+		layout, size = _DecideLayout( contentSize, preferred, verticalSize, horizontalSize, minimalSize.size )
 		
-		if  preferred == 'minimal':
-			layout = 'minimal'
-			size = minimalSize
+		# the layout methods in the order of the layouts
+		createLayout = ( self._MinimalLayout, self._HorizontalLayout, self._VerticalLayout )[ layout ]
 		
-		elif preferred == 'horizontal' and canUseHorizontal:
-			layout = 'horizontal'
-			size = horizontalSize
-		
-		elif preferred == 'vertical' and canUseVertical:
-			layout = 'vertical'
-			size = verticalSize
-		
-		elif canUseHorizontal:
-			layout = 'horizontal'
-			size = horizontalSize
-		
-		elif canUseVertical:
-			layout = 'vertical'
-			size = verticalSize
-		
-		else:
-			layout = 'minimal'
-			size = minimalSize
-		
-		return layout, size
-	
-	def _CreateLayout( self, options ):
-		"""Creates the layout chosen for the window from subelements."""
-		
-		layout = self._layout
-		
-		if layout == 'vertical':
-			self._VerticalLayout( options )
-			
-		elif layout == 'horizontal':
-			self._HorizontalLayout( options )
-			
-		elif layout == 'minimal':
-			self._MinimalLayout( options )
+		return createLayout, Size( size )
 	
 	def _HorizontalSize( self ):	
-		"""Calculates the size of the horizontal layout."""
+		"""Calculates the size of the horizontal layout. Returns the size as a ( height, width ) tuple."""
 		
 		pad = self._padding
+		key = ( 'horizontal', pad.height, pad.width )
+		
+		try:
+			return self._sizeCache[ key ]
+		except KeyError:
+			pass
 		
 		# maximal horizontal size is the width of the graph, the width of the vertical details
 		maxHorizontal = Graph.minSize.width + pad.width + VerticalDetails.minSize.width
@@ -1219,14 +1273,21 @@ class PriceDisplay( _SpacedCollection ):
 		# minimal vertical size is the height of the vertical details plus an extra line for the lower graph caret
 		minVertical = VerticalDetails.minSize.height + pad.height			# leave space for the lower graph caret line
 		
-		horizontalSize = Size( ( minVertical, maxHorizontal ) )
+		horizontalSize = ( minVertical, maxHorizontal )
+		self._sizeCache[ key ] = horizontalSize
 		
 		return horizontalSize
 	
 	def _VerticalSize( self ):	
-		"""Calculates the size of the vertical layout."""
+		"""Calculates the size of the vertical layout. Returns the size as a ( height, width ) tuple."""
 		
 		pad = self._padding
+		key = ( 'vertical', pad.height, pad.width )
+		
+		try:
+			return self._sizeCache[ key ]
+		except KeyError:
+			pass
 		
 		# minimal horizontal size is the width of the horizontal details
 		minHorizontal = HorizontalDetails.minSize.width
@@ -1234,20 +1295,21 @@ class PriceDisplay( _SpacedCollection ):
 		# maximal vertical size is the height of the graph and the height of the horizontal details
 		maxVertical = Graph.minSize.height + pad.height + HorizontalDetails.minSize.height
 		
-		verticalSize = Size( ( maxVertical, minHorizontal ) )
+		verticalSize = ( maxVertical, minHorizontal )
+		self._sizeCache[ key ] = verticalSize
 		
 		return verticalSize
 	
 	def _HorizontalLayout( self, options ):
 		"""Displays the graph and price details in a horizontal layout."""
 		
-		options['height'] = VerticalDetails.minSize.height + 1		# leave extra line for the lower graph caret
+		options['height'] = self._horizontalGraphHeight
 		
-		row = [ Graph, VerticalDetails ]
 		if options['reverse']:
-			row.reverse()				# reverse the order of the elements
+			elems = self._horizontalElemsReversed
+		else:
+			elems = self._horizontalElems
 		
-		elems = [ row ]
 		self._AddElements( elems )
 	
 	def _MinimalLayout( self, options ):
@@ -1259,14 +1321,11 @@ class PriceDisplay( _SpacedCollection ):
 	def _VerticalLayout( self, options ):
 		"""Displays the graph and price details in a vertical layout."""
 		
-		options['width'] = HorizontalDetails.minSize.width
-		
-		elems = [
-				[ Graph ],
-				[ HorizontalDetails ]
-			]
+		options['width'] = self._verticalGraphWidth
 		
 		if options['reverse']:
-			elems.reverse()				# reverse the order of the elements
+			elems = self._verticalElemsReversed
+		else:
+			elems = self._verticalElems
 		
 		self._AddElements( elems )